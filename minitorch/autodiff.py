@@ -1,6 +1,8 @@
 from abc import ABC
 from collections.abc import Iterable
 from typing import List
+import contextlib
+import threading
 
 variable_count = 1
 
@@ -20,6 +22,8 @@ class Variable:
         name (string) : a globally unique name of the variable
     """
 
+    __slots__ = ("history", "_derivative", "unique_id", "name", "used")
+
     def __init__(self, history, name=None):
         global variable_count
         assert history is None or isinstance(history, History), history
@@ -48,7 +52,7 @@ class Variable:
         Args:
             val (bool): whether to require grad
         """
-        self.history = History()
+        self.history = _EMPTY_HISTORY
 
     def backward(self, d_output=None):
         """
@@ -144,6 +148,8 @@ class Context:
         saved_tensors (tuple) : alias for saved_values
     """
 
+    __slots__ = ("_saved_values", "no_grad")
+
     def __init__(self, no_grad=False):
         self._saved_values = None
         self.no_grad = no_grad
@@ -170,6 +176,9 @@ class Context:
         return self.saved_values
 
 
+_NO_GRAD_CONTEXT = Context(no_grad=True)
+
+
 class History:
     """
     `History` stores the history of `Function` operations that was
@@ -182,6 +191,8 @@ class History:
 
     """
 
+    __slots__ = ("last_fn", "ctx", "inputs")
+
     def __init__(self, last_fn=None, ctx=None, inputs=None):
         self.last_fn = last_fn
         self.ctx = ctx
@@ -205,6 +216,58 @@ class History:
         return var_derivatives
 
 
+class _EmptyHistory(History):
+    """
+    Read-only leaf history. Variables that require grad but were not
+    produced by a function all share :data:`_EMPTY_HISTORY`, so it cannot
+    be modified.
+    """
+
+    __slots__ = ()
+
+    def __init__(self):
+        for name in History.__slots__:
+            object.__setattr__(self, name, None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("The shared empty history cannot be modified")
+
+    def __reduce__(self):
+        return "_EMPTY_HISTORY"
+
+
+_EMPTY_HISTORY = _EmptyHistory()
+
+
+class _MemoTable(threading.local):
+    table = None
+
+
+# The memo table of this thread, and the number of memo blocks open in any
+# thread. While no block is open, `FunctionBase.apply` skips the lookup.
+_MEMO = _MemoTable()
+_MEMO_LOCK = threading.Lock()
+_memo_depth = 0
+
+
+@contextlib.contextmanager
+def _memo_block():
+    "Open a memo table for this thread, unless one is open already."
+    global _memo_depth
+    outer = _MEMO.table
+    if outer is None:
+        _MEMO.table = {}
+    with _MEMO_LOCK:
+        _memo_depth += 1
+    try:
+        yield
+    finally:
+        with _MEMO_LOCK:
+            _memo_depth -= 1
+        if outer is None:
+            _MEMO.table = None
+
+
 class FunctionBase(ABC):
     """
     A function that can act on :class:`Variable` arguments to
@@ -244,7 +307,9 @@ class FunctionBase(ABC):
         c) Attaches the Context to the History of the new variable.
 
         There is a bit of internal complexity in our implementation
-        to handle both scalars and tensors.
+        to handle both scalars and tensors. Inside a memo block (see
+        :func:`scalar_memo`), a repeated call on the same inputs returns
+        the earlier result.
 
         Args:
             vals (list of Variables or constants) : The arguments to forward
@@ -252,7 +317,18 @@ class FunctionBase(ABC):
         Returns:
             `Variable` : The new variable produced
 
+        Raises:
+            TypeError: if `forward` does not return `data_type`
         """
+        memo = _MEMO.table if _memo_depth else None
+        if memo is not None:
+            # An input that starts requiring grad needs a new, recorded node.
+            key = (cls,) + tuple(
+                (id(v), isinstance(v, Variable) and v.history is None) for v in vals
+            )
+            if key in memo:
+                return memo[key][1]
+
         # Go through the variables to see if any needs grad.
         raw_vals = []
         need_grad = False
@@ -265,21 +341,28 @@ class FunctionBase(ABC):
             else:
                 raw_vals.append(v)
 
-        # Create the context.
-        ctx = Context(not need_grad)
+        # Create the context. Without any input needing grad nothing is
+        # recorded, so share one context that discards saved values.
+        ctx = Context() if need_grad else _NO_GRAD_CONTEXT
 
         # Call forward with the variables.
         c = cls.forward(ctx, *raw_vals)
-        assert isinstance(c, cls.data_type), "Expected return typ %s got %s" % (
-            cls.data_type,
-            type(c),
-        )
+        if not isinstance(c, cls.data_type):
+            # A TypeError (not an assert) lets callers such as
+            # `derivative_check` tell that `vals` held unsupported numbers.
+            raise TypeError(
+                "Expected return typ %s got %s" % (cls.data_type, type(c))
+            )
 
         # Create a new variable from the result with a new history.
         back = None
         if need_grad:
             back = History(cls, ctx, vals)
-        return cls.variable(cls.data(c), back)
+        out = cls.variable(cls.data(c), back)
+        if memo is not None:
+            # Keep `vals` alive so their ids stay unique within the memo.
+            memo[key] = (vals, out)
+        return out
 
     @classmethod
     def chain_rule(cls, ctx, inputs, d_output):
@@ -299,9 +382,9 @@ class FunctionBase(ABC):
         # Tip: Note when implementing this function that
         # cls.backward may return either a value or a tuple.
         derivatives = cls.backward(ctx, d_output)
-        derivatives = derivatives if isinstance(derivatives, Iterable) else (derivatives,)
+        derivatives = wrap_tuple(derivatives)
         variables = inputs if isinstance(inputs, Iterable) else (inputs,)
-        var_derivatives = [(var, derivative) for (var, derivative) in zip(variables, derivatives)
+        var_derivatives = [(var, var.expand(derivative)) for (var, derivative) in zip(variables, derivatives)
                            if not is_constant(var)]
         return var_derivatives
 
@@ -1,9 +1,17 @@
 """
 Collection of the core mathematical operators used throughout the code base.
+
+The elementary (non higher-order) operators only use arithmetic,
+comparisons and :mod:`math`, so they can be compiled with :func:`jit`.
 """
 
 import math
 
+try:
+    import numba
+except ImportError:  # pragma: no cover
+    numba = None
+
 
 # ## Task 0.1
 
@@ -19,6 +27,16 @@ def mul_back(x, y, d):
     return d * y, d * x
 
 
+def div(x, y):
+    """:math:`f(x, y) = x / y`"""
+    return x / y
+
+
+def div_back(x, y, d):
+    r"""If :math:`f(x, y) = x / y` compute :math:`d \times f'_x` and :math:`d \times f'_y`"""
+    return d / y, -d * x / y ** 2
+
+
 def id(x):
     """:math:`f(x) = x`"""
     return x
@@ -41,14 +59,14 @@ def neg_back(d):
 
 def lt(x, y):
     """:math:`f(x) =` 1.0 if x is less than y else 0.0"""
-    return float(x < y)
+    return 1.0 if x < y else 0.0
 
 
 def eq(x, y):
     """:math:`f(x) =` 1.0 if x is equal to y else 0.0"""
     # Note: if x or y is float type, use `np.isclose` is better
     # return float(x == y)
-    return abs(x - y) <= 1e-8
+    return 1.0 if abs(x - y) <= 1e-8 else 0.0
 
 
 def max(x, y):
@@ -99,6 +117,21 @@ def sigmoid_back(x, d):
     return d * sigmoid(x) * (1 - sigmoid(x))
 
 
+def sigmoid_back_from_output(s, d):
+    r"""
+    Same as :func:`sigmoid_back`, but given the forward output
+    :math:`s = f(x)` instead of `x`, using :math:`f'(x) = s (1 - s)`.
+
+    Args:
+        s (float): sigmoid output
+        d (float): derivative
+
+    Returns:
+        float : sigmoid derivative times `d`
+    """
+    return d * s * (1 - s)
+
+
 def relu(x):
     """
     :math:`f(x) =` x if x is greater than 0, else 0
@@ -111,7 +144,7 @@ def relu(x):
     Returns:
         float : relu value
     """
-    return x if x > 0 else 0
+    return x if x > 0 else 0.0
 
 
 def log(x):
@@ -126,7 +159,7 @@ def exp(x):
 
 def exp_back(x, d):
     r"""If :math:`f = exp` compute d :math:`d \times f'(x)`"""
-    return d * exp(x)
+    return d * math.exp(x)
 
 
 def log_back(x, d):
@@ -146,7 +179,27 @@ def inv_back(x, d):
 
 def relu_back(x, d):
     r"""If :math:`f = relu` compute d :math:`d \times f'(x)`"""
-    return d if x > 0 else 0
+    return d if x > 0 else 0.0
+
+
+def jit(fn):
+    """
+    Compile an elementary operator with :func:`numba.njit`.
+
+    Calling a compiled function from the interpreter costs more than the
+    plain function itself, so the operators above stay uncompiled. Use this
+    when an operator is called from inside other numba-compiled code.
+    Without numba installed `fn` is returned unchanged.
+
+    Args:
+        fn (function): one of the elementary operators
+
+    Returns:
+        function : compiled version of `fn`
+    """
+    if numba is None:  # pragma: no cover
+        return fn
+    return numba.njit(cache=True)(fn)
 
 
 # ## Task 0.3
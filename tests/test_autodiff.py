@@ -138,3 +138,52 @@ def test_backprop4():
     var4 = Function1.apply(var2, var3)
     var4.backward(d_output=5)
     assert var0.derivative == 10
+
+
+@pytest.mark.task1_4
+def test_constant_fold():
+    # Constants and grad-free Scalars produce constants, with no history.
+    const = minitorch.Scalar(2.0, None)
+    out = Function2.apply(Function1.apply(const, 3.0), const)
+    assert out.history is None
+    assert out.data == (2.0 + 3.0 + 10) * 2.0 + (2.0 + 3.0 + 10)
+
+
+@pytest.mark.task1_4
+def test_tape_backward():
+    # Walking a tape should match generic backpropagation.
+    def f(x, y):
+        return Function2.apply((x * y).sigmoid(), y - x).log() / (y + 10.0)
+
+    x1, y1 = minitorch.Scalar(0.5), minitorch.Scalar(2.0)
+    d_x, d_y = minitorch.CompiledTape(f(x1, y1), [x1, y1]).backward(5)
+
+    x2, y2 = minitorch.Scalar(0.5), minitorch.Scalar(2.0)
+    minitorch.backpropagate(f(x2, y2), 5)
+
+    assert d_x == pytest.approx(x2.derivative)
+    assert d_y == pytest.approx(y2.derivative)
+
+
+class Noise(minitorch.ScalarFunction):
+    "A forward that is not a pure function of its input."
+    draws = iter(range(2, 100))
+
+    @staticmethod
+    def forward(ctx, x):
+        scale = float(next(Noise.draws))
+        ctx.save_for_backward(scale)
+        return x * scale
+
+    @staticmethod
+    def backward(ctx, d_output):
+        return d_output * ctx.saved_values
+
+
+@pytest.mark.task1_4
+def test_tape_backward_recorded_ctx():
+    # The tape backward uses the contexts recorded by the forward pass.
+    x = minitorch.Scalar(1.5)
+    out = Noise.apply(x)
+    scale = out.data / 1.5
+    assert minitorch.CompiledTape(out).backward() == [scale]
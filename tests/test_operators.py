@@ -12,10 +12,14 @@ from minitorch.operators import (
     eq,
     max,
     sigmoid,
+    sigmoid_back,
+    sigmoid_back_from_output,
     relu_back,
     log_back,
     inv_back,
+    exp_back,
     sum,
+    jit,
 )
 from hypothesis import given
 from hypothesis.strategies import lists
@@ -111,6 +115,13 @@ def test_sigmoid(a):
     assert sigmoid(a + 0.1) >= ans
 
 
+@pytest.mark.task0_2
+@given(small_floats, small_floats)
+def test_sigmoid_back_from_output(a, d):
+    "Check that backward from the sigmoid output matches backward from the input"
+    assert_close(sigmoid_back_from_output(sigmoid(a), d), sigmoid_back(a, d))
+
+
 @pytest.mark.task0_2
 @given(small_floats, small_floats, small_floats)
 def test_transitive(a, b, c):
@@ -222,3 +233,20 @@ def test_backs(a, b):
     relu_back(a, b)
     inv_back(a + 2.4, b)
     log_back(abs(a) + 4, b)
+
+
+JIT_ONE_ARG = [(fn, jit(fn)) for fn in [neg, relu, sigmoid]]
+JIT_TWO_ARG = [
+    (fn, jit(fn))
+    for fn in [mul, add, lt, eq, max, sigmoid_back_from_output, exp_back, relu_back]
+]
+
+
+@pytest.mark.task0_1
+@given(small_floats, small_floats)
+def test_jit(a, b):
+    "Check that the elementary operators compile and match the python version"
+    for fn, compiled in JIT_ONE_ARG:
+        assert compiled(a) == fn(a)
+    for fn, compiled in JIT_TWO_ARG:
+        assert compiled(a, b) == fn(a, b)
@@ -1,7 +1,11 @@
-from minitorch import central_difference, operators, derivative_check, Scalar
+from minitorch import central_difference, complex_step, operators, derivative_check, Scalar
+import copy
+import warnings
 import pytest
 import minitorch
 from hypothesis import given
+from hypothesis.strategies import lists
+import numpy as np
 from .strategies import small_scalars, small_floats, assert_close
 from minitorch import MathTestVariable
 
@@ -27,6 +31,27 @@ def test_central_diff():
     assert_close(d, operators.exp(2.0))
 
 
+@pytest.mark.task1_1
+def test_central_diff_vectorized():
+    d = central_difference(lambda x, y: x * y + x, 5, 10, vectorized=True)
+    assert d.shape == (2,)
+    assert_close(d[0], 11.0)
+    assert_close(d[1], 5.0)
+
+
+@pytest.mark.task1_1
+def test_complex_step():
+    d = complex_step(operators.mul, 5, 10, arg=0)
+    assert d == 10.0
+
+    d = complex_step(lambda x: 1.0 / (x + 3.5), 2.0, arg=0)
+    assert abs(d + 1.0 / 5.5 ** 2) < 1e-12
+
+    # Comparisons are not complex-safe.
+    with pytest.raises(TypeError):
+        complex_step(operators.relu, 2.0, arg=0)
+
+
 # ## Task 1.2 - Test each of the different function types
 
 
@@ -88,8 +113,362 @@ def test_two_derivative(fn, t1, t2):
     derivative_check(scalar_fn, t1, t2)
 
 
+@given(small_floats, small_floats)
+@pytest.mark.task1_4
+def test_derivative_check_scalar_only(a, b):
+    # Functions that only accept Scalars fall back to central difference.
+    derivative_check(lambda x, y: minitorch.Mul.apply(x, y), Scalar(a), Scalar(b))
+    derivative_check(lambda x, y: Scalar(2.0) * x + y, Scalar(a), Scalar(b))
+
+
+@pytest.mark.task1_4
+def test_derivative_check_uses_backward(monkeypatch):
+    monkeypatch.setattr(minitorch.Mul, "backward", lambda ctx, d: (100.0, 100.0))
+    with pytest.raises(AssertionError):
+        derivative_check(lambda x, y: x * y, Scalar(1.5), Scalar(2.0))
+
+
+def doubled_log(ctx, a):
+    "A broken `Log.forward`, so its backward no longer matches."
+    ctx.save_for_backward(a)
+    return 2.0 * operators.log(a)
+
+
+@pytest.mark.task1_4
+def test_derivative_check_replay_uses_forward(monkeypatch):
+    # Log.apply cannot take duals, so the check replays the tape.
+    monkeypatch.setattr(minitorch.Log, "forward", staticmethod(doubled_log))
+    with pytest.raises(AssertionError):
+        derivative_check(lambda x: minitorch.Log.apply(x), Scalar(1.5))
+    with pytest.raises(AssertionError):
+        derivative_check(lambda x: x.log() * Scalar(1.0, None), Scalar(1.5))
+
+
+@pytest.mark.task1_4
+def test_derivative_check_dual_uses_forward(monkeypatch):
+    # Duals skip Log.forward, so its broken output must not go unnoticed.
+    monkeypatch.setattr(minitorch.Log, "forward", staticmethod(doubled_log))
+    with pytest.raises(AssertionError):
+        derivative_check(lambda x: x.log(), Scalar(1.5))
+
+
 def test_scalar_name():
     x = Scalar(10, name="x")
     y = (x + 10.0) * 20
     y.name = "y"
     return y
+
+
+def test_checkpoint():
+    def segment(a, b):
+        return ((a * b).sigmoid() + a).log() * b
+
+    x1, y1 = Scalar(1.5), Scalar(-0.5)
+    segment(x1, y1).backward()
+
+    x2, y2 = Scalar(1.5), Scalar(-0.5)
+    out = minitorch.checkpoint(segment)(x2, y2)
+    # Only the checkpoint node itself is recorded.
+    assert out.history.last_fn is minitorch.Checkpoint
+    out.backward()
+
+    assert_close(out.data, segment(Scalar(1.5, None), Scalar(-0.5, None)).data)
+    assert_close(x2.derivative, x1.derivative)
+    assert_close(y2.derivative, y1.derivative)
+
+
+def test_div_sub_single_node():
+    x, y = Scalar(3.0), Scalar(4.0)
+    z = x / y
+    assert z.history.last_fn is minitorch.Div
+    assert all(isinstance(v, Scalar) and v.is_leaf() for v in z.history.inputs)
+    z.backward()
+    assert_close(x.derivative, 1 / 4.0)
+    assert_close(y.derivative, -3.0 / 16.0)
+
+    x, y = Scalar(3.0), Scalar(4.0)
+    z = x - y
+    assert z.history.last_fn is minitorch.Sub
+    z.backward()
+    assert x.derivative == 1.0
+    assert y.derivative == -1.0
+
+
+def mixed_ops(x, y):
+    return (
+        (x * y + 2.0).sigmoid()
+        - (x + 3.5).relu() / (y * y + 4.0)
+        + (y * y + 1.0).log()
+        + (x < y)
+    )
+
+
+@given(small_floats, small_floats)
+def test_compile_tape(a, b):
+    tape = minitorch.compile_tape(mixed_ops, 1.0, 2.0)
+    x, y = Scalar(a), Scalar(b)
+    out = mixed_ops(x, y)
+    out.backward()
+
+    assert_close(tape.forward(a, b), out.data)
+    value, grads = tape.grad(a, b)
+    assert_close(value, out.data)
+    assert_close(grads[0], x.derivative)
+    assert_close(grads[1], y.derivative)
+
+
+def every_op(x, y):
+    return (
+        (x * y).sigmoid() * y
+        + (x * x + 1.0).log() / (y * y + 3.0)
+        - (-x).relu()
+        + (x - y).relu()
+        + (y / 50.0).exp()
+        + minitorch.Inv.apply(x * x + 2.0)
+        + (x < y)
+        + (x == y)
+    )
+
+
+@given(small_floats, small_floats)
+def test_compile_tape_jit(a, b):
+    # The compiled walk must agree with the ScalarFunction backwards.
+    tape = minitorch.compile_tape(every_op, a, b, jit=True)
+    x, y = Scalar(a), Scalar(b)
+    every_op(x, y).backward()
+    for d, expected in zip(tape.backward(), [x.derivative, y.derivative]):
+        assert_close(d, expected)
+    _, grads = tape.grad(b, a)
+    for d, expected in zip(grads, minitorch.compile_tape(every_op, b, a).backward()):
+        assert_close(d, expected)
+
+
+def scaled_log_back(x, d):
+    return 2.0 * d / x
+
+
+def test_compile_tape_jit_operators(monkeypatch):
+    tape = minitorch.compile_tape(lambda x: (x * 3.0).log(), 2.0, jit=True)
+    assert_close(tape.backward()[0], 0.5)
+    # The compiled walk follows the current derivative operators.
+    monkeypatch.setattr(operators, "log_back", scaled_log_back)
+    assert_close(tape.backward()[0], 1.0)
+
+
+class Scale(minitorch.Mul):
+    "A function the compiled walk does not know."
+
+
+def test_compile_tape_jit_custom():
+    def f(x):
+        return Scale.apply(x, 3.0)
+
+    assert_close(minitorch.compile_tape(f, 2.0).backward()[0], 3.0)
+    with pytest.raises(TypeError):
+        minitorch.compile_tape(f, 2.0, jit=True)
+
+
+@given(small_floats, small_floats)
+def test_compile_tape_float32(a, b):
+    wide = minitorch.compile_tape(mixed_ops, a, b)
+    narrow = minitorch.compile_tape(mixed_ops, a, b, jit=True, dtype=np.float32)
+    assert narrow.saved.dtype == np.float32
+    assert narrow.saved_wide.dtype == np.float64
+    for d32, d64 in zip(narrow.backward(), wide.backward()):
+        assert d32 == pytest.approx(d64, rel=1e-5, abs=1e-5)
+
+
+def test_compile_tape_float32_log():
+    # The argument of log underflows in float32 but must not be read from it.
+    tape = minitorch.compile_tape(
+        lambda x: (x * 1e-30 * 1e-30).log(), 1.0, jit=True, dtype=np.float32
+    )
+    assert tape.backward()[0] == pytest.approx(1.0, rel=1e-5)
+
+
+def test_compile_tape_saved_columns():
+    def f(x, y):
+        return ((x * y).sigmoid() * y + x) / (y + 3.0)
+
+    wide = minitorch.compile_tape(f, 0.5, 2.0, jit=True)
+    narrow = minitorch.compile_tape(f, 0.5, 2.0, jit=True, dtype=np.float32)
+    # Two Muls and a Sigmoid save five values, the Div two; Add saves none.
+    assert (len(narrow.saved), len(narrow.saved_wide)) == (5, 2)
+    assert narrow.saved.nbytes + narrow.saved_wide.nbytes == 36
+    assert wide.saved.nbytes + wide.saved_wide.nbytes == 56
+    for d32, d64 in zip(narrow.backward(), wide.backward()):
+        assert d32 == pytest.approx(d64, rel=1e-5)
+
+    # A positive ReLU argument that float32 rounds to zero keeps its sign.
+    tape = minitorch.compile_tape(
+        lambda x: (x * 1e-30 * 1e-30).relu(), 1.0, jit=True, dtype=np.float32
+    )
+    assert tape.backward()[0] == pytest.approx(1e-60)
+
+
+def test_compile_tape_float32_range():
+    # Mul and Sigmoid values outside the float32 range stay in float64.
+    def f(x):
+        return x * 1e39 * 1.0 + (x * 1e-40).sigmoid() * (x - 200.0).sigmoid()
+
+    wide = minitorch.compile_tape(f, 2.0, jit=True)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        narrow = minitorch.compile_tape(f, 2.0, jit=True, dtype=np.float32)
+        assert narrow.backward()[0] == pytest.approx(wide.backward()[0], rel=1e-6)
+        _, grads = narrow.grad(3.0)
+    assert grads[0] == pytest.approx(wide.grad(3.0)[1][0], rel=1e-6)
+    assert minitorch.scalar.OP_MUL_WIDE in narrow.code
+    assert minitorch.scalar.OP_SIGMOID_WIDE in narrow.code
+    assert minitorch.scalar.OP_MUL_WIDE not in wide.code
+
+
+@given(lists(small_floats, min_size=1, max_size=5), small_floats)
+def test_vscalar(xs, y):
+    def f(a, b):
+        return ((a * b).sigmoid() + (a - 2.0).relu() + (a + 150).log()) / (b * b + 1.0)
+
+    batch = minitorch.VScalar(xs)
+    b = minitorch.VScalar([y] * len(xs))
+    out = f(batch, b)
+    assert isinstance(out, minitorch.VScalar)
+    out.backward(np.ones(len(xs)))
+
+    for i, x in enumerate(xs):
+        single, other = Scalar(x), Scalar(y)
+        expected = f(single, other)
+        expected.backward()
+        assert_close(out.data[i], expected.data)
+        assert_close(batch.derivative[i], single.derivative)
+        assert_close(b.derivative[i], other.derivative)
+
+
+def test_vscalar_scalar():
+    # A Scalar used across a batch gets the derivative summed over it.
+    w = Scalar(2.0)
+    batch = minitorch.VScalar([1.0, 2.0, 3.0])
+    (batch * w + w).backward(np.ones(3))
+    assert isinstance(w.derivative, float)
+    assert_close(w.derivative, 9.0)
+    np.testing.assert_allclose(batch.derivative, [2.0, 2.0, 2.0])
+
+
+def test_scalar_slots():
+    x = Scalar(1.0)
+    assert not hasattr(x, "__dict__")
+    assert not hasattr((x * 2.0).history, "__dict__")
+
+
+def test_empty_history():
+    x, y = Scalar(1.0), Scalar(2.0)
+    assert x.history is y.history
+    assert x.is_leaf() and not minitorch.autodiff.is_constant(x)
+    with pytest.raises(AttributeError):
+        x.history.last_fn = minitorch.Add
+    (x * y).backward()
+    assert x.derivative == 2.0
+    assert Scalar(1.0, None).history is None
+
+
+@given(small_floats, small_floats)
+def test_forward_derivative(a, b):
+    x, y = Scalar(a), Scalar(b)
+    mixed_ops(x, y).backward()
+    assert_close(minitorch.forward_derivative(mixed_ops, a, b, arg=0), x.derivative)
+    assert_close(minitorch.forward_derivative(mixed_ops, a, b, arg=1), y.derivative)
+
+
+def test_forward_derivative_independent(monkeypatch):
+    # Forward mode must not share derivative rules with the backwards it checks.
+    for name in ["mul_back", "div_back", "log_back", "exp_back", "relu_back"]:
+        monkeypatch.setattr(operators, name, None)
+
+    def f(x):
+        return (x * x).log() / x + x.exp().relu()
+
+    x = 1.5
+    expected = (2.0 - operators.log(x * x)) / (x * x) + operators.exp(x)
+    assert_close(minitorch.forward_derivative(f, x), expected)
+
+
+def test_forward_derivative_scalar():
+    # Duals do not mix with Scalars; derivative_check falls back instead.
+    with pytest.raises(TypeError):
+        minitorch.forward_derivative(lambda x: x * Scalar(2.0), 1.5)
+    with pytest.raises(TypeError):
+        minitorch.forward_derivative(lambda x: Scalar(x.v), 1.5)
+    derivative_check(lambda x: x * Scalar(2.0), Scalar(1.5))
+
+
+def test_scalar_intern():
+    # Grad-free results land on the shared constants.
+    a, b = Scalar(3.0, None), Scalar(5.0, None)
+    assert (a < b) is (b - a - 1.0) / 1.0
+    assert (a < b).data == 1.0
+    assert (a < b) is not (Scalar(3.0) < b)
+    assert copy.deepcopy(a < b) is (a < b)
+
+    # The shared constants cannot be turned into variables.
+    with pytest.raises(AttributeError):
+        (a < b).requires_grad_(True)
+    assert minitorch.autodiff.is_constant(a < b)
+
+    # Scalars created directly are never shared.
+    assert Scalar(1.0, None) is not Scalar(1.0, None)
+    assert Scalar(1.0, None).requires_grad_(True) is None
+    minitorch.Parameter(Scalar(0.0, None), name="w")
+    derivative_check(lambda x: x * 2.0, Scalar(1.0, None))
+    assert Scalar(np.array(1.0), None).data == 1.0
+    with pytest.raises(TypeError):
+        Scalar(1 + 0j, None)
+
+    # -0.0 is not interned as 0.0.
+    assert str((-Scalar(0.0, None)).data) == "-0.0"
+
+
+def test_scalar_memo():
+    x, y, z = Scalar(2.0), Scalar(3.0), Scalar(4.0)
+    with minitorch.scalar_memo():
+        a = x * y
+        out = x * y + x * y * z
+    assert x * y is not a
+    assert out.history.inputs[0] is a
+    assert minitorch.autodiff._memo_depth == 0
+    out.backward()
+    assert_close(x.derivative, 3.0 * (1 + 4.0))
+    assert_close(y.derivative, 2.0 * (1 + 4.0))
+    assert_close(z.derivative, 6.0)
+
+    # A constant that starts requiring grad is not served from the memo.
+    c, w = Scalar(3.0, None), Scalar(2.0, None)
+    with minitorch.scalar_memo():
+        assert (c * w).history is None
+        c.requires_grad_(True)
+        out = c * w
+    out.backward()
+    assert c.derivative == 2.0
+
+
+@given(small_floats, small_floats)
+def test_tape_codegen(a, b):
+    tape = minitorch.compile_tape(mixed_ops, a, b)
+    forward = tape.codegen()
+    assert_close(forward(a, b), tape.forward(a, b))
+    assert_close(forward(b, a), tape.forward(b, a))
+
+    # Same topology (different constants) reuses the generated code.
+    other = minitorch.compile_tape(lambda x, y: mixed_ops(x, y) * 3.0, a, b)
+    again = minitorch.compile_tape(lambda x, y: mixed_ops(x, y) * 5.0, b, a)
+    assert other.codegen().func is again.codegen().func
+
+
+def test_derivative_check_codegen():
+    # Without dual support, derivative_check replays the generated code.
+    codegen = minitorch.scalar._codegen
+    codegen.cache_clear()
+    derivative_check(
+        lambda x, y: minitorch.Mul.apply(x, y).sigmoid() + y, Scalar(0.5), Scalar(2.0)
+    )
+    info = codegen.cache_info()
+    assert info.misses == 1
+    assert info.maxsize is not None